@@ -1,6 +1,7 @@
 import argparse
+import functools
 import hashlib
-import re
+import math
 import turtle as t
 
 #takes an arbitrary input, hashes it, and converts the 256-bit hash into an L-system
@@ -48,7 +49,26 @@ START_CHAR = "." #Special character to signal we're in the start state
 STOP_CHAR = '~' #Force-stops the pushdown parser
 RULE_SIZE_MAX = 15
 
-COLORS = [
+STATE_CHARS = RULE_CHARS + "+-[]@&()" + STOP_CHAR + START_CHAR #every state of the pushdown automata, the index is its id
+STATE_BYTES = STATE_CHARS.encode('ascii') #state id -> ascii code of its char
+STOP_ID = STATE_CHARS.index(STOP_CHAR)
+START_ID = STATE_CHARS.index(START_CHAR)
+NONEMPTY_OFFSET = len(STATE_CHARS) * 16 #where the nonempty stack rows start in a packed transition table
+STACK_DELTA = [(char == '[') - (char == ']') for char in STATE_CHARS] #state id -> change in stack height
+
+TURN_CHARS = "+-&()" #chars that change the drawing state without drawing anything
+COMMAND_CHARS = TURN_CHARS + "[]@" #every char that does not just move forward
+COMMAND_OPS = {char : (char, 1) for char in COMMAND_CHARS} #the opcode of each command, see LSystem.compile_opcodes
+
+HIGH_NIBBLES = bytes(b>>4 for b in range(256)) #bytes.translate tables, byte value -> its high / low nibble
+LOW_NIBBLES = bytes(b & 0xF for b in range(256))
+#num_of_chars -> str.translate table turning a byte into the two seed chars of its nibbles
+SEED_TABLES = {
+    n : {b : RULE_CHARS[HIGH_NIBBLES[b] % n] + RULE_CHARS[LOW_NIBBLES[b] % n] for b in range(256)}
+    for n in range(2, len(RULE_CHARS) + 1)
+}
+
+COLORS = (
     "#A846A0", "#7D4FFF", "#8A71CE", "#FF7FED", 
     "#FFB766", "#FFD800", "#FFE14F", "#FF7A28",
     "#5EF1FF", "#FFECEA", "#FF877C", "#7C87FF",
@@ -57,12 +77,33 @@ COLORS = [
     "#FF757E", "#758EFF", "#9F4CFF", "#87FFFD",
     "#3D91FF", "#2172FF", "#FF26CC", "#FF7FEB",
     "#EE9EFF", "#FFC587", "#F9D8FF", "#FFF2CE"
-]
+)
 
 BG_COLOR = "#E6D4B2"
 STEM_COLOR = "#4C8033"
+CANVAS_TAG = "plant" #canvas tag of everything draw_on_canvas creates, so it can be cleared with the turtle's drawing
+
+def rgb_to_hex(color, colormode):
+    #(r, g, b) with channels from 0 to colormode (see t.colormode) -> "#rrggbb", the Tk canvas only takes color strings
+    #anything else (ex. a color name) is kept as is
+    if isinstance(color, str):
+        return color
+    return "#%02x%02x%02x" % tuple(round(c * 255 / colormode) for c in color)
+
+def hex_to_rgb(color):
+    #"#RRGGBB" -> (r, g, b) in turtle's default 0-1 colormode. turtle checks a color string with a Tk call
+    #every time it is set, a tuple is only formatted. Anything else (ex. a color name from a plant file) is kept as is
+    if len(color) == 7 and color[0] == '#':
+        try:
+            return tuple(int(color[i:i + 2], 16) / 255 for i in (1, 3, 5))
+        except ValueError:
+            pass
+    return color
+
+STEM_RGB = hex_to_rgb(STEM_COLOR)
 
 given_speed = 6
+given_batch = 1 #only every given_batch-th turtle move is shown while animating
 
 class LSystem():
     def __init__(self, mapping : dict, seed : str, scale : float = 1, color : str = "#FFFFFF") -> None:
@@ -72,62 +113,271 @@ class LSystem():
         self.scale = scale
         self.color = color
 
+        #rule char -> its replacement, for str.translate
+        #chars without a rule are not in the table and pass through unchanged
+        self.table = str.maketrans({key : val for key, val in mapping.items() if len(key) == 1})
+
+        self.generation = 0 #which generation self.state is
+
+    def get_nth_state(self, n):
+        #jump forward to generation n. Both return it and update self.state
+        #every generation in between is rewritten in the same translate pass
+        if n > self.generation:
+            self.state = self.state.translate(self.expand_k(n - self.generation))
+            self.generation = n
+        return self.state
+
+    def expand_k(self, k):
+        #the translate table for k generations at once, rule char -> its k-th expansion
+        #built by repeated squaring, each step translates the bodies of one table through the other
+        table = None
+        step = self.table
+        while k:
+            if k & 1:
+                table = step if table is None else {char : body.translate(step) for char, body in table.items()}
+            k >>= 1
+            if k:
+                step = {char : body.translate(step) for char, body in step.items()}
+        return table
+
     def get_next_state(self):
         #update the state. Both return it and update self.state
+        return self.get_nth_state(self.generation + 1)
 
-        nstate = ""
+    def compile_opcodes(self):
+        #yields the state as (char, count) pairs. A run of forward chars is a single ('F', run)
+        #and every command is its shared pair from COMMAND_OPS
+        run = 0
         for char in self.state:
-            if char in self.mapping.keys(): #safety, ignores invalid chars
-                nstate += self.mapping[char]
+            op = COMMAND_OPS.get(char)
+            if op is None:
+                run += 1
             else:
-                nstate += char
+                if run:
+                    yield 'F', run
+                    run = 0
+                yield op
+        if run:
+            yield 'F', run
+
+    def trace_state(self, x, y, heading):
+        #simulates the turtle over the current state with plain floats, starting from (x, y) facing heading
+        #yields the drawing as (kind, points) in drawing order, each one as soon as it is finished:
+        #  ('F', points) is a stem stroke, a polyline with no pen up inside it
+        #  ('@', points) is a flower outline, the polygon t.circle would trace
+        #points are (x, y, heading), heading being where the turtle faces on its way to that point
+        #the last item is (None, (x, y, heading)), the pose the turtle ends in
+        step = BASE_LENGTH/self.scale
+        flower_rad = BASE_FLOWER_RAD/self.scale
+        heading %= 360
+        #angle is the turn a + makes, (BASE_ANGLE + turning modifier) * swap const
+        #increment is ANGLE_INCREMENT * swap const. Only & ( ) change them
+        angle = BASE_ANGLE
+        increment = ANGLE_INCREMENT
+        stack = []
+        drawing = [] #what the current op finished, yielded before the next op
+        stroke = [(x, y, heading)]
+        append = stroke.append
+
+        def flush():
+            nonlocal stroke, append
+            if len(stroke) > 1:
+                drawing.append(('F', stroke))
+            stroke = [(x, y, heading)]
+            append = stroke.append
+
+        #one handler per opcode
+        def forward(run):
+            nonlocal x, y
+            dx, dy = heading_vector(heading)
+            x += run * step * dx
+            y += run * step * dy
+            append((x, y, heading))
+
+        #headings are kept in [0, 360) so the handful of directions a plant uses all hit heading_vector's cache
+        def turn_left(run):
+            nonlocal heading
+            heading = (heading + angle) % 360
+
+        def turn_right(run):
+            nonlocal heading
+            heading = (heading - angle) % 360
+
+        def push(run):
+            stack.append((heading, x, y, angle, increment))
+
+        def pop(run):
+            nonlocal heading, x, y, angle, increment
+            heading, x, y, angle, increment = stack.pop()
+            flush()
+
+        def flower(run):
+            flush()
+            drawing.append(('@', circle_points(x, y, heading, flower_rad)))
+
+        def swap(run):
+            nonlocal angle, increment
+            angle = -angle
+            increment = -increment
+
+        def decrement_angle(run):
+            nonlocal angle
+            angle -= increment
+
+        def increment_angle(run):
+            nonlocal angle
+            angle += increment
+
+        handlers = {
+             'F'    :   forward
+            ,'+'    :   turn_left
+            ,'-'    :   turn_right
+            ,'['    :   push
+            ,']'    :   pop
+            ,'@'    :   flower
+            ,'&'    :   swap
+            ,'('    :   decrement_angle
+            ,')'    :   increment_angle
+        }
+
+        for char, run in self.compile_opcodes():
+            handlers[char](run)
+            if drawing:
+                yield from drawing
+                drawing.clear()
+        flush()
+        yield from drawing
+
+        yield None, (x, y, heading)
 
-        self.state = nstate
-        return nstate
-    
     def draw_state(self):
-        swap_const = 1
-        turning_modifier = 0
-        stack = []
-        for char in self.state:
-            if char == '+':
-                t.left((BASE_ANGLE + turning_modifier) * swap_const)
-            elif char == '-':
-                t.right((BASE_ANGLE + turning_modifier) * swap_const)
-            elif char == '[':
-                #needs to save position and direction on the stack
-                stack.append((t.heading(), t.pos(), swap_const, turning_modifier))
-            elif char == ']':
-                t.penup()
-                head, pos, swap_const, turning_modifier = stack.pop()
-                t.setheading(head)
-                t.goto(pos)
-                t.pendown()
-            elif char == '@':
-                t.color(self.color) 
-                t.begin_fill()
-                t.circle(BASE_FLOWER_RAD/self.scale)
-                t.end_fill()
-                t.color(STEM_COLOR)
-            elif char == '&':
-                swap_const = -swap_const
-            elif char == '(':
-                turning_modifier -= ANGLE_INCREMENT
-            elif char == ')':
-                turning_modifier += ANGLE_INCREMENT
+        if t.tracer() == 0:
+            #nothing is animated, so draw straight onto the canvas
+            self.draw_on_canvas()
+            return
+
+        #walk the turtle along the traced strokes, turning it before each line
+        #its pose is tracked here, not read back from the turtle
+        facing = t.heading()
+        here = tuple(t.pos())
+        goto, setheading, penup, pendown = t.goto, t.setheading, t.penup, t.pendown
+        color, begin_fill, end_fill = t.color, t.begin_fill, t.end_fill
+        flower_color = hex_to_rgb(self.color)
+
+        def face(heading):
+            nonlocal facing
+            if heading != facing:
+                setheading(heading)
+                facing = heading
+
+        def jump(point):
+            #lift the pen only when the next stroke really starts somewhere else, ex. after a ]
+            if point != here:
+                penup()
+                goto(point)
+                pendown()
+
+        def walk(points):
+            for x, y, heading in points:
+                face(heading)
+                goto(x, y)
+
+        #the pen only changes color when a stem follows a flower or the other way around
+        flower_pen = False
+        for kind, points in self.trace_state(*here, facing):
+            if kind is None: #the pose at the end, not a stroke
+                x, y, heading = points
+                break
+            x, y, heading = points[0]
+            face(heading)
+            jump((x, y))
+            if kind == '@':
+                if not flower_pen:
+                    color(flower_color)
+                    flower_pen = True
+                begin_fill()
+                walk(points[1:])
+                end_fill()
             else:
-                t.forward(BASE_LENGTH/self.scale)
+                if flower_pen:
+                    color(STEM_RGB)
+                    flower_pen = False
+                walk(points[1:])
+            here = points[-1][:2]
+
+        if flower_pen:
+            color(STEM_RGB)
+        face(heading)
+        jump((x, y))
+
+    def draw_on_canvas(self):
+        #same drawing as draw_state, but every stroke goes to the Tk canvas as a single create_line
+        screen = t.getscreen()
+        canvas = screen.getcanvas()
+        xscale, yscale = screen.xscale, screen.yscale
+        width = t.pensize()
+        create_line, create_polygon = canvas.create_line, canvas.create_polygon
+        flower_color = self.color
+        stem_color = rgb_to_hex(t.pencolor(), t.colormode()) #draw_state only switches to STEM_COLOR after the first flower
+
+        for kind, points in self.trace_state(*t.pos(), t.heading()):
+            if kind is None: #the pose at the end, not a stroke
+                x, y, heading = points
+                break
+            coords = [coord for px, py, _ in points for coord in (px * xscale, -py * yscale)] #y points down on the canvas
+            if kind == '@':
+                create_polygon(coords, fill=flower_color, outline="", tags=CANVAS_TAG)
+                create_line(coords, fill=flower_color, width=width, capstyle="round", tags=CANVAS_TAG)
+                stem_color = STEM_COLOR
+            else:
+                create_line(coords, fill=stem_color, width=width, capstyle="round", tags=CANVAS_TAG)
 
-    def reset_and_advance(self):
+        #leave the turtle where it would have ended up
+        t.penup()
+        t.setheading(heading)
+        t.goto(x, y)
+        t.pendown()
+        t.update()
+
+    def clear_drawing(self):
         t.goto(0,0)
         t.clear() 
+        t.getcanvas().delete(CANVAS_TAG) #whatever draw_on_canvas put there
         t.setheading(90)
+
+    def reset_and_advance(self):
+        self.clear_drawing()
         self.get_next_state()
         self.draw_state()
 
 
-def pushdown_parser(digest, empty_stack_transitions, nonempty_transitions):
+@functools.lru_cache(maxsize=512)
+def heading_vector(heading):
+    #unit vector for a heading in degrees. A plant only ever faces a small set of headings, so this is almost always a cache hit
+    rad = math.radians(heading)
+    return math.cos(rad), math.sin(rad)
+
+def circle_points(x, y, heading, radius):
+    #the corners of the polygon t.circle(radius) would trace from (x, y) facing heading, start and end included
+    #as (x, y, heading) points, heading being where the turtle faces along the side ending there
+    steps = 1 + int(min(11 + abs(radius) / 6.0, 59.0)) #same step count turtle picks for a full circle
+    turn = 360.0 / steps
+    side = 2.0 * radius * math.sin(math.radians(turn / 2))
+    points = [(x, y, heading)]
+    heading += turn / 2
+    for _ in range(steps):
+        side_heading = heading % 360
+        dx, dy = heading_vector(side_heading)
+        x += side * dx
+        y += side * dy
+        points.append((x, y, side_heading))
+        heading += turn
+
+    return points
+
+def pushdown_parser(digest, packed_transitions):
     #Runs a pushdown automata for plants with only F, +, -, [, ], and @ operations (F is 2 to 7 different characters)
+    #packed_transitions maps the number of rule chars to that count's packed transition table (see pack_transitions)
 
     #first 3 bits decide how many mapped characters there will be. Minimum 2, max 7
     first = digest[0]
@@ -136,7 +386,7 @@ def pushdown_parser(digest, empty_stack_transitions, nonempty_transitions):
         num_of_chars += 2
 
     #next 5 bits decide the color of any flowers.
-    flower_color = COLORS[int(first & 0x1F)]
+    flower_color = COLORS[first & 0x1F]
     
     #collate next 29 bytes into 58 nibbles, and partition them into num_of_chars different sections
     #the last 2 bytes define the 4-character seed
@@ -146,79 +396,99 @@ def pushdown_parser(digest, empty_stack_transitions, nonempty_transitions):
 
     available_chars = RULE_CHARS[:num_of_chars]
 
-    #rectify the transition rules by changing unavailable chars into their equivalents
-    empty_stack_transitions = rectify_transition(empty_stack_transitions, available_chars)
-    nonempty_transitions = rectify_transition(nonempty_transitions, available_chars)
+    #the transition rules with unavailable chars already changed into their equivalents
+    transitions = packed_transitions[num_of_chars]
 
-    stack = 0
+    rule_len = min(RULE_SIZE_MAX, partition_size)
     rules = {}
     for idx, char in enumerate(available_chars):
-        state = '.'
-        rule = ""
-        for i in range(min(RULE_SIZE_MAX,partition_size)):
-            current_nibble = rule_nibbles[idx * partition_size + i]
-            if stack == 0:
-                next_char = empty_stack_transitions[state][current_nibble]
-            else:
-                next_char = nonempty_transitions[state][current_nibble]
+        start = idx * partition_size
+        rules[char] = run_automaton(rule_nibbles[start:start + rule_len], transitions)
 
-            if next_char == '[':
-                stack += 1
-            elif next_char == ']':
-                stack -= 1
+    #remaining nibbles define the seed
+    #each byte becomes two chars, high nibble first
+    seed = digest[30:].decode('latin-1').translate(SEED_TABLES[num_of_chars])
 
-            if next_char == STOP_CHAR:
-                break
+    for key, rule in rules.items():
+        rules[key] = cleanup_rule(rule)
 
-            rule += next_char
-            state = next_char
-        
-        rule += ']' * stack #pop the rest of the stack
-        rules[char] = rule
-        stack = 0
+    return rules, seed, flower_color
 
-    #remaining nibbles define the seed
-    seed_nibbles = bytes_to_nibbles(digest[30:])
-    seed = "".join(available_chars[nib % num_of_chars] for nib in seed_nibbles)
+def run_automaton(nibbles, transitions):
+    #the inner loop of the pushdown parser: walks one rule's nibbles through a packed transition table
+    #and returns the rule written on the way
+    state = START_ID
+    stack = 0
+    rule = bytearray() #ascii codes of the rule
+    for nibble in nibbles:
+        state = transitions[(stack > 0) * NONEMPTY_OFFSET + state * 16 + nibble]
+        if state == STOP_ID:
+            break
 
-    for key in rules.keys():
-        rules[key] = cleanup_rule(rules[key])
+        stack += STACK_DELTA[state] #+1 for [, -1 for ], 0 otherwise
+        rule.append(STATE_BYTES[state])
 
-    return rules, seed, flower_color
+    return rule.decode('ascii') + ']' * stack #pop the rest of the stack
 
 def cleanup_rule(rule):
-    newrule = rule
-    while newrule != re.sub(r"\[[\+\-\&\(\)]*\]", "", newrule): 
-        newrule = re.sub(r"\[[\+\-\&\(\)]*\]", "", newrule)
+    #removes branches that only turn (ex. A[+-&]B -> AB) and turns right before a pop (ex. [A+-] -> [A])
+    #the stack holds where each open branch starts in out and whether it has drawn anything
+    out = []
+    stack = []
+    for char in rule:
+        if char == '[':
+            stack.append([len(out), False])
+            out.append(char)
+        elif char == ']':
+            while out and out[-1] in TURN_CHARS:
+                out.pop()
+            if stack:
+                start, draws = stack.pop()
+                if not draws:
+                    del out[start:] #drop the whole branch
+                    continue
+                if stack:
+                    stack[-1][1] = True
+            out.append(char)
+        else:
+            if stack and char not in TURN_CHARS:
+                stack[-1][1] = True
+            out.append(char)
 
-    return re.sub(r"[\+\-\&\(\)]+\]","]",newrule) 
+    return "".join(out)
 
 def bytes_to_nibbles(in_bytes):
-    n = []
-    for b in in_bytes:
-        n.append(int(b>>4 & 0xF))
-        n.append(int(b & 0xF))
-    return n
-
-def rectify_transition(tran, available_chars): #TODO maybe refactor this
-    newtran = {}
-    for key in tran.keys(): #maps rule chars to available chars based on their index % num_of_chars
-        rule = tran[key]
-        newrule = ""
-        for char in rule:
-            replacement = char
-            if char in RULE_CHARS and char not in available_chars:
-                replacement = available_chars[RULE_CHARS.index(char) % len(available_chars)] 
-            newrule += replacement
-        newtran[key] = newrule
-
-    return newtran
+    #returns bytes with two nibbles per input byte, high nibble first
+    nibbles = bytearray(2 * len(in_bytes))
+    nibbles[0::2] = in_bytes.translate(HIGH_NIBBLES)
+    nibbles[1::2] = in_bytes.translate(LOW_NIBBLES)
+    return bytes(nibbles)
+
+def rectify_transition(tran, available_chars):
+    #maps rule chars to available chars based on their index % num_of_chars
+    table = str.maketrans({
+        char : available_chars[idx % len(available_chars)]
+        for idx, char in enumerate(RULE_CHARS) if char not in available_chars
+    })
+    return {key : rule.translate(table) for key, rule in tran.items()}
+
+def pack_transitions(empty_stack_transitions, nonempty_transitions):
+    #flattens a pair of transition tables into one bytes object holding state ids (indices into STATE_CHARS)
+    #the next state is packed[NONEMPTY_OFFSET * (stack > 0) + state * 16 + nibble]
+    #rows a table does not define can never be reached, they are filled with the stop state
+    packed = bytearray([STOP_ID]) * (2 * NONEMPTY_OFFSET)
+    for offset, tran in ((0, empty_stack_transitions), (NONEMPTY_OFFSET, nonempty_transitions)):
+        for key, row in tran.items():
+            start = offset + STATE_CHARS.index(key) * 16
+            packed[start:start + 16] = bytes(STATE_CHARS.index(char) for char in row)
+
+    return bytes(packed)
 
 def plant_to_file(fname : str, lsys : LSystem):
     try:
         with open(fname, 'w') as f:
-            for key in lsys.mapping.keys():
-                f.write(f"{key} : {lsys.mapping[key]}\n")
+            for key, rule in lsys.mapping.items():
+                f.write(f"{key} : {rule}\n")
             f.write("\n")
             f.write(f"{lsys.seed}\n")
             f.write(f"{lsys.color}")
@@ -247,7 +517,7 @@ def speed_up():
     t.tracer(0,0)
 
 def speed_down():
-    t.tracer(1, 25)
+    t.tracer(given_batch, 25)
     t.speed(given_speed)
 
 def zoom_in():
@@ -258,84 +528,102 @@ def zoom_out():
     width, height = win.screensize()
     win.screensize(width * 1.5, height * 1.5)
 
+#represents a transition matrix
+#since the stack is only relevant to one character, we can use this to simplify the code
+EMPTY_STACK_TRANSITIONS_6OP = {
+     "."    :   "ABCDEFGAB[[[[DFG"
+    ,"A"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "+["
+    ,"B"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "[-"
+    ,"C"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "+["
+    ,"D"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "[-"
+    ,"E"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "+["
+    ,"F"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "[-"
+    ,"G"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "+["
+    ,"+"    :   "ABCDEFG+A[+D@" + STOP_CHAR + "+["
+    ,"-"    :   "ABCDEFGB-[C-@" + STOP_CHAR + "[-"
+    ,"]"    :   "ABCD[[[@@[EF@" + STOP_CHAR + "G["
+    ,"@"    :   "ABCDEFG[[[EFG" + STOP_CHAR + "+-"
+}
+
+NONEMPTY_TRANSITIONS_6OP = {
+     "A"    :   "ABCDEFG+-[]A@" + STOP_CHAR + "]-"
+    ,"B"    :   "ABCDE-G+-[]B@" + STOP_CHAR + "+]"
+    ,"C"    :   "ABCD+FG+-[]C@" + STOP_CHAR + "[-"
+    ,"D"    :   "ABC-EFG+-[]D@" + STOP_CHAR + "+]"
+    ,"E"    :   "AB+DEFG+-[]E@" + STOP_CHAR + "[-"
+    ,"F"    :   "A-CDEFG+-[]F@" + STOP_CHAR + "+]"
+    ,"G"    :   "+BCDEFG+-[]G@" + STOP_CHAR + "]-"
+    ,"+"    :   "ABCDEFG+A[BD@E+F"
+    ,"-"    :   "ABCDEFGB-[CD@FG-"
+    ,"["    :   "+-+-+-C+-[+-+-+-"
+    ,"]"    :   "ABCD[[[]-[+-@" + STOP_CHAR + "[]"
+    ,"@"    :   "AB]]]]G+-[+--" + STOP_CHAR + "+-"
+}
+
+EMPTY_STACK_TRANSITIONS_FULL = {
+     "."    :   "ABCDEFGAB[[[[DFG"
+    ,"A"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "&)" 
+    ,"B"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "(&"
+    ,"C"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "&)"
+    ,"D"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "(&"
+    ,"E"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "&)"
+    ,"F"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "(&"
+    ,"G"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "&)"
+    ,"+"    :   "ABCDEFG+A[+[@" + STOP_CHAR + "(&"
+    ,"-"    :   "ABCDEFGB-[C[@" + STOP_CHAR + "&)"
+    ,"]"    :   "ABCD[[[@@[E[@" + STOP_CHAR + "(&"
+    ,"@"    :   "ABCDEFG[[[E[G" + STOP_CHAR + "&)"
+    ,"&"    :   "ABCDEFG+-[[-@" + STOP_CHAR + "()" 
+    ,"("    :   "ABCDEFG+-[[&@" + STOP_CHAR + "(@"
+    ,")"    :   "ABCDEFG+-[[&@" + STOP_CHAR + "@)" 
+}
+
+NONEMPTY_TRANSITIONS_FULL = {
+     "A"    :   "ABCDEFG+-[]&@" + STOP_CHAR + "()"
+    ,"B"    :   "ABCDE-G+-[]&@" + STOP_CHAR + "()"
+    ,"C"    :   "ABCD+FG+-[]&@" + STOP_CHAR + "()"
+    ,"D"    :   "ABC-EFG+-[]&@" + STOP_CHAR + "()"
+    ,"E"    :   "AB+DEFG+-[]&@" + STOP_CHAR + "()"
+    ,"F"    :   "A-CDEFG+-[]&@" + STOP_CHAR + "()"
+    ,"G"    :   "+BCDEFG+-[]&@" + STOP_CHAR + "()"
+    ,"+"    :   "ABCDEFG+A[B&@E+F"
+    ,"-"    :   "ABCDEFGB-[C&@FG-"
+    ,"["    :   "+-+-+-C+-[+-+-+-"
+    ,"]"    :   "ABCD[[[]-[+&@" + STOP_CHAR + "[]"
+    ,"@"    :   "AB]]]]G+-[+&-" + STOP_CHAR + "+-"
+    ,"&"    :   "ABCDEFG+-[[+@" + STOP_CHAR + "()" 
+    ,"("    :   "ABCDEFG+-[[&@" + STOP_CHAR + "(E"
+    ,")"    :   "ABCDEFG+-[[&@" + STOP_CHAR + "F)"
+}
+
+#the transition tables rectified and packed for every possible number of rule chars
+#maps num_of_chars -> packed table, see pack_transitions
+PACKED_TRANSITIONS_6OP = {
+    n : pack_transitions(rectify_transition(EMPTY_STACK_TRANSITIONS_6OP, RULE_CHARS[:n]), rectify_transition(NONEMPTY_TRANSITIONS_6OP, RULE_CHARS[:n]))
+    for n in range(2, len(RULE_CHARS) + 1)
+}
+PACKED_TRANSITIONS_FULL = {
+    n : pack_transitions(rectify_transition(EMPTY_STACK_TRANSITIONS_FULL, RULE_CHARS[:n]), rectify_transition(NONEMPTY_TRANSITIONS_FULL, RULE_CHARS[:n]))
+    for n in range(2, len(RULE_CHARS) + 1)
+}
+
+def new_hasher():
+    #the hash only seeds the drawing, so let OpenSSL skip any security-only checks where it can (Python 3.9+)
+    try:
+        return hashlib.sha256(usedforsecurity=False)
+    except TypeError:
+        return hashlib.sha256()
+
 def produce_system_from_string(user_input, use_full_parser=False):
-    hasher = hashlib.sha256()
+    hasher = new_hasher()
     hasher.update(user_input.encode('utf-8'))
 
     digest = hasher.digest()
 
-    #represents a transition matrix
-    #since the stack is only relevant to one character, we can use this to simplify the code
-    empty_stack_transitions_6op = {
-         "."    :   "ABCDEFGAB[[[[DFG"
-        ,"A"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "+["
-        ,"B"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "[-"
-        ,"C"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "+["
-        ,"D"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "[-"
-        ,"E"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "+["
-        ,"F"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "[-"
-        ,"G"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "+["
-        ,"+"    :   "ABCDEFG+A[+D@" + STOP_CHAR + "+["
-        ,"-"    :   "ABCDEFGB-[C-@" + STOP_CHAR + "[-"
-        ,"]"    :   "ABCD[[[@@[EF@" + STOP_CHAR + "G["
-        ,"@"    :   "ABCDEFG[[[EFG" + STOP_CHAR + "+-"
-    }
-
-    nonempty_transitions_6op = {
-         "A"    :   "ABCDEFG+-[]A@" + STOP_CHAR + "]-"
-        ,"B"    :   "ABCDE-G+-[]B@" + STOP_CHAR + "+]"
-        ,"C"    :   "ABCD+FG+-[]C@" + STOP_CHAR + "[-"
-        ,"D"    :   "ABC-EFG+-[]D@" + STOP_CHAR + "+]"
-        ,"E"    :   "AB+DEFG+-[]E@" + STOP_CHAR + "[-"
-        ,"F"    :   "A-CDEFG+-[]F@" + STOP_CHAR + "+]"
-        ,"G"    :   "+BCDEFG+-[]G@" + STOP_CHAR + "]-"
-        ,"+"    :   "ABCDEFG+A[BD@E+F"
-        ,"-"    :   "ABCDEFGB-[CD@FG-"
-        ,"["    :   "+-+-+-C+-[+-+-+-"
-        ,"]"    :   "ABCD[[[]-[+-@" + STOP_CHAR + "[]"
-        ,"@"    :   "AB]]]]G+-[+--" + STOP_CHAR + "+-"
-    }
-
-    empty_stack_transitions_full = {
-         "."    :   "ABCDEFGAB[[[[DFG"
-        ,"A"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "&)" 
-        ,"B"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "(&"
-        ,"C"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "&)"
-        ,"D"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "(&"
-        ,"E"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "&)"
-        ,"F"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "(&"
-        ,"G"    :   "ABCDEFG[[[[[@" + STOP_CHAR + "&)"
-        ,"+"    :   "ABCDEFG+A[+[@" + STOP_CHAR + "(&"
-        ,"-"    :   "ABCDEFGB-[C[@" + STOP_CHAR + "&)"
-        ,"]"    :   "ABCD[[[@@[E[@" + STOP_CHAR + "(&"
-        ,"@"    :   "ABCDEFG[[[E[G" + STOP_CHAR + "&)"
-        ,"&"    :   "ABCDEFG+-[[-@" + STOP_CHAR + "()" 
-        ,"("    :   "ABCDEFG+-[[&@" + STOP_CHAR + "(@"
-        ,")"    :   "ABCDEFG+-[[&@" + STOP_CHAR + "@)" 
-    }
-
-    nonempty_transitions_full = {
-         "A"    :   "ABCDEFG+-[]&@" + STOP_CHAR + "()"
-        ,"B"    :   "ABCDE-G+-[]&@" + STOP_CHAR + "()"
-        ,"C"    :   "ABCD+FG+-[]&@" + STOP_CHAR + "()"
-        ,"D"    :   "ABC-EFG+-[]&@" + STOP_CHAR + "()"
-        ,"E"    :   "AB+DEFG+-[]&@" + STOP_CHAR + "()"
-        ,"F"    :   "A-CDEFG+-[]&@" + STOP_CHAR + "()"
-        ,"G"    :   "+BCDEFG+-[]&@" + STOP_CHAR + "()"
-        ,"+"    :   "ABCDEFG+A[B&@E+F"
-        ,"-"    :   "ABCDEFGB-[C&@FG-"
-        ,"["    :   "+-+-+-C+-[+-+-+-"
-        ,"]"    :   "ABCD[[[]-[+&@" + STOP_CHAR + "[]"
-        ,"@"    :   "AB]]]]G+-[+&-" + STOP_CHAR + "+-"
-        ,"&"    :   "ABCDEFG+-[[+@" + STOP_CHAR + "()" 
-        ,"("    :   "ABCDEFG+-[[&@" + STOP_CHAR + "(E"
-        ,")"    :   "ABCDEFG+-[[&@" + STOP_CHAR + "F)"
-    }
-
     if use_full_parser:
-        rules, seed, flower_color = pushdown_parser(digest, empty_stack_transitions_full, nonempty_transitions_full)
+        rules, seed, flower_color = pushdown_parser(digest, PACKED_TRANSITIONS_FULL)
     else:
-        rules, seed, flower_color = pushdown_parser(digest, empty_stack_transitions_6op, nonempty_transitions_6op)
+        rules, seed, flower_color = pushdown_parser(digest, PACKED_TRANSITIONS_6OP)
 
     if FLOWERS_ONLY_AT_TIP:
         rules['@'] = ''
@@ -368,8 +656,7 @@ def main(args, win : t._Screen, gstr : str = None):
     win.screensize(3000, 2000)
 
     if depth is not None:
-        for _ in range(depth):
-            lsys.get_next_state()
+        lsys.get_nth_state(depth)
         speed_up()
         lsys.draw_state()
         speed_down()
@@ -396,6 +683,7 @@ if __name__ == '__main__':
     parser.add_argument("--tipflowers", "-f", help="Flowers last only for the generation that produced them. Default false", action="store_true")
     parser.add_argument("--full", "-l", help="Use full (9-operation) parser", action="store_true")
     parser.add_argument("--genstring", "-g", help="Generation string to use instead of asking stdin. Use quotation marks for a longer input")
+    parser.add_argument("--batch", "-b", help="Only show every Nth move of the turtle while drawing slowly. Grows large plants faster without going instant. Default 1", type=int, default=1)
 
     args = parser.parse_args()
 
@@ -411,12 +699,14 @@ if __name__ == '__main__':
         win.bgcolor(BG_COLOR)
         win.screensize(3000, 2000)
         t.color(STEM_COLOR)
+        given_batch = max(1, args.batch)
 
         if args.speed == -1:
             t.tracer(0, 0)
             t.speed("fastest")
         else:
             given_speed = min(10, max(0, args.speed))
+            t.tracer(given_batch)
             t.speed(given_speed)
     
         main(args, win, genstring) 
@@ -1,5 +1,6 @@
 import argparse
 import hashlib
+import math
 import turtle as t
 
 import random
@@ -7,30 +8,14 @@ import time
 
 SPECIAL_INPUTS = ["charlie", "caasi", "relic", "zem", "mara", "andy", "kyle", "miles", "sam", "tesoro"] #author added by popular demand
 PROMPT_LIST = ["What's on your mind?", "What do you dream about?", "What was your first memory?", "Are you looking for something?", "Who are you?", "What's your question?"]
+FORWARD, RIGHT, LEFT, CIRCLE, SPIRAL, COLOR, RECURSE = range(7) #instruction opcodes, see create_instructions
+CANVAS_TAG = "drawing" #on the lines draw_on_canvas makes, main deletes them by hand since t.reset() leaves them behind
 
 #cool pattern:
 #"do you need m to explain it again?"
 
-def square_spiral(size): 
-    src = t.pos()
-    size = int(size)
-
-    parity = -1 * size % 2
-
-    for _ in range(0, size % 12 + 3):
-        t.fd(size)
-        t.lt(parity * 90)
-        size *= 0.8
-
-    t.penup()
-    t.setpos(src)
-    t.pendown()
-    return 0
-
-def change_color(ins_color):
-    #change the turtle color
+def shift_color(curr_color, ins_color):
     #get current color, shift left by 2, xor with input color
-    curr_color = t.pencolor()
     ins_color = int(ins_color)
     
     new_color = []
@@ -41,32 +26,178 @@ def change_color(ins_color):
 
         new_color.append(new_val)
 
-    t.color(new_color)
+    return new_color
 
-def draw_recurse(inst_list, scale, depth):
+def rgb_to_hex(color, colormode):
+    #(r, g, b) with channels from 0 to colormode (see t.colormode) -> "#rrggbb", the Tk canvas only takes color strings
+    #anything else (ex. a color name) is kept as is
+    if isinstance(color, str):
+        return color
+    return "#%02x%02x%02x" % tuple(round(c * 255 / colormode) for c in color)
 
-    if depth < 0:
-        return
+def draw_recurse(inst_list, scale, depth):
 
-    for inst in inst_list:
-        if inst[0] == draw_recurse: #call the recursive part
-            scaledown = inst[1][1] * scale
-            pos = t.pos()
-            draw_recurse(inst[1][0], scaledown, depth-1) 
+    if t.tracer() == 0:
+        #--speed -1 shows only the finished picture, so it goes straight onto the canvas
+        draw_on_canvas(inst_list, scale, depth)
+        return 0
+
+    #trace_instructions has already done the recursion, the turtle just turns and follows its lines
+    pen_color = t.pencolor()
+    facing = t.heading()
+    here = t.pos()
+    goto = t.goto
+
+    for stroke_color, points in trace_instructions(inst_list, scale, depth, *here, facing, pen_color):
+        if stroke_color is None: #the end of the drawing
+            place_turtle(points, pen_color)
+            break
+        if stroke_color is not pen_color:
+            t.color(stroke_color)
+            pen_color = stroke_color
+        x, y, heading = points[0]
+        if (x, y) != here: #back from a recursion or a square spiral, don't draw the way back
             t.penup()
-            t.setpos(pos) #saves the coords we came from and reloads them after the recursion
+            goto(x, y)
             t.pendown()
-        else:
-            operand = inst[1][0] / scale
-            inst[0](operand) #call the function described with the value it's paired with, divided by scale factor
+        for x, y, heading in points[1:]:
+            if heading != facing: #the turns made before this line
+                t.setheading(heading)
+                facing = heading
+            goto(x, y)
+        here = (x, y)
 
     return 0
 
+def place_turtle(end, pen_color):
+    #moves the turtle to the (x, y, heading, color) a drawing ended in without drawing on the way
+    #pen_color is the color the turtle has now, t.color is only called if the drawing ended in another one
+    x, y, heading, color = end
+    if t.pos() != (x, y):
+        t.penup()
+        t.goto(x, y)
+        t.pendown()
+    t.setheading(heading)
+    if color is not pen_color:
+        t.color(color)
+
+def trace_instructions(inst_list, scale, depth, x, y, heading, color):
+    #simulates the instructions with plain floats, starting from (x, y) facing heading with the pen in color
+    #yields the drawing as (color, points) polylines with no pen up or color change inside them, each one
+    #as soon as it is finished. The last item is (None, (x, y, heading, color)), how the turtle ends up
+    #points are (x, y, heading), heading being where the turtle faces on the line to that point
+    finished = [] #strokes the current instruction ended, yielded before the next instruction runs
+    stroke = [(x, y, heading)]
+
+    def flush():
+        nonlocal stroke
+        if len(stroke) > 1:
+            finished.append((color, stroke))
+        stroke = [(x, y, heading)]
+
+    def forward(distance):
+        nonlocal x, y
+        rad = math.radians(heading)
+        x += distance * math.cos(rad)
+        y += distance * math.sin(rad)
+        stroke.append((x, y, heading))
+
+    def turn_right(angle):
+        nonlocal heading
+        heading -= angle
+
+    def turn_left(angle):
+        nonlocal heading
+        heading += angle
+
+    def circle(radius):
+        #the same polygon t.circle draws for a full circle
+        steps = 1 + int(min(11 + abs(radius) / 6.0, 59.0))
+        turn = 360.0 / steps
+        side = 2.0 * radius * math.sin(math.radians(turn / 2))
+        if radius < 0:
+            side, turn = -side, -turn
+        turn_left(turn / 2)
+        for _ in range(steps):
+            forward(side)
+            turn_left(turn)
+        turn_left(-turn / 2)
+
+    def spiral(size):
+        #a shrinking square spiral, then back to where it started without drawing
+        nonlocal x, y
+        src = (x, y)
+        size = int(size)
+
+        parity = -1 * size % 2
+
+        for _ in range(0, size % 12 + 3):
+            forward(size)
+            turn_left(parity * 90)
+            size *= 0.8
+
+        x, y = src
+        flush()
+
+    def recolor(ins_color):
+        nonlocal color
+        flush()
+        color = shift_color(color, ins_color)
+
+    handlers = {
+         FORWARD    :   forward
+        ,RIGHT      :   turn_right
+        ,LEFT       :   turn_left
+        ,CIRCLE     :   circle
+        ,SPIRAL     :   spiral
+        ,COLOR      :   recolor
+    }
+
+    def walk(inst_list, scale, depth):
+        nonlocal x, y
+        if depth < 0:
+            return
+
+        for inst in inst_list:
+            if inst[0] == RECURSE: #the recursive part
+                pos = (x, y)
+                yield from walk(inst[1][0], inst[1][1] * scale, depth-1)
+                x, y = pos #saves the coords we came from and reloads them after the recursion
+                flush()
+            else:
+                handlers[inst[0]](inst[1][0] / scale)
+
+            if finished:
+                yield from finished
+                finished.clear()
+
+    yield from walk(inst_list, scale, depth)
+    flush()
+    yield from finished
+
+    yield None, (x, y, heading, color)
+
+def draw_on_canvas(inst_list, scale, depth):
+    #same drawing as draw_recurse, but every stroke goes to the Tk canvas as a single create_line
+    screen = t.getscreen()
+    canvas = screen.getcanvas()
+    xscale, yscale = screen.xscale, screen.yscale
+    width = t.pensize()
+    colormode = t.colormode()
+    pen_color = t.pencolor()
+
+    for stroke_color, points in trace_instructions(inst_list, scale, depth, *t.pos(), t.heading(), pen_color):
+        if stroke_color is None: #the end of the drawing
+            place_turtle(points, pen_color)
+            break
+        coords = [coord for px, py, _ in points for coord in (px * xscale, -py * yscale)] #y points down on the canvas
+        canvas.create_line(coords, fill=rgb_to_hex(stroke_color, colormode), width=width, capstyle="round", tags=CANVAS_TAG)
+
 def create_instructions(digest):
     inst = []
 
     #for each pair of bytes in digest
-    #convert the first byte into an opcode -- one of fd, rt, lt, change_color, draw_recurse, square_spiral, or change_color
+    #convert the first byte into an opcode -- one of FORWARD, RIGHT, LEFT, CIRCLE, SPIRAL, COLOR, or RECURSE
     #second byte is the argument. Usually this is just a value, but sometimes it needs two params, so we use a tuple
 
     for idx in range(0, len(digest), 2): 
@@ -75,23 +206,30 @@ def create_instructions(digest):
 
         inst_ops = [operand]
         if opcode < 70: 
-            inst.append((t.fd, inst_ops)) 
+            inst.append((FORWARD, inst_ops)) 
         elif opcode < 100:
-            inst.append((t.rt, inst_ops))
+            inst.append((RIGHT, inst_ops))
         elif opcode < 140:
-            inst.append((t.lt, inst_ops))
+            inst.append((LEFT, inst_ops))
         elif opcode < 155:
-            inst.append((t.circle, inst_ops))
+            inst.append((CIRCLE, inst_ops))
         elif opcode < 170:
-            inst.append((square_spiral, inst_ops))
+            inst.append((SPIRAL, inst_ops))
         elif opcode < 200:
-            inst.append((change_color, inst_ops)) 
+            inst.append((COLOR, inst_ops)) 
         else: #>=200
             inst_ops = [inst, operand % 4 + 1]
-            inst.append((draw_recurse, inst_ops))
+            inst.append((RECURSE, inst_ops))
 
     return inst
 
+def new_hasher():
+    #not a security use, the digest just picks the drawing. The keyword needs Python 3.9+
+    try:
+        return hashlib.sha256(usedforsecurity=False)
+    except TypeError:
+        return hashlib.sha256()
+
 def main():
 
     parser = argparse.ArgumentParser(description="Talk to the turtle and let them draw beautiful pictures for you")
@@ -110,7 +248,7 @@ def main():
         print("I love you")
 
 
-    hasher = hashlib.sha256()
+    hasher = new_hasher()
     hasher.update(user_input.encode('utf-8'))
 
     digest = hasher.digest()
@@ -137,6 +275,7 @@ def main():
         hasher.update(next_seed)
         digest = hasher.digest()
         print(next_seed.decode('utf-8'))
+        t.getcanvas().delete(CANVAS_TAG)
         t.reset()
         
     t.exitonclick()